@@ -1,6 +1,8 @@
 import pygame
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Initialize Pygame and mixer
 pygame.init()
@@ -15,6 +17,13 @@ FONT_SIZE = 16
 TITLE_FONT_SIZE = 24
 ITEM_HEIGHT = 30
 INDENT_SIZE = 20
+PREFETCH_LIMIT = 32  # Max folders queued or being scanned ahead of an expand
+PREFETCH_NEIGHBOURS = 4  # Folders prefetched on each side of an expanded folder
+PREFETCH_WORKERS = 2
+SCAN_WORKERS = 4  # Workers for folders the user expands
+
+# Every letter-case spelling of ".wav", so str.endswith matches case-insensitively without lower()
+WAV_SUFFIXES = ('.wav', '.WAV', '.Wav', '.wAv', '.waV', '.WAv', '.WaV', '.wAV')
 
 # Colors
 DARK_BG = (30, 30, 40)
@@ -39,6 +48,11 @@ class FileItem:
         self.children = []
         self.expanded = False
         self.loaded = False
+        # Rendered row text, reused while (expanded, color) is unchanged
+        self._cached_surf = None
+        self._cached_key = None
+        # Directory listing scanned ahead of time by the prefetch workers
+        self._prefetched_children = None
 
 class AudioBrowser:
     def __init__(self, root_dir):
@@ -52,51 +66,179 @@ class AudioBrowser:
 
         # File browser state
         self.root_item = FileItem("Dirt-Samples", root_dir, True, 0)
-        self.flat_items = []
+        self._flat_cache = []
+        self._flat_index = {}
+        self._flat_dirty = True
+        self.n_dirs = 0
+        self.n_wavs = 0
         self.selected_item = None
         self.currently_playing = None
         self.scroll_offset = 0
         self.max_visible_items = (SCREEN_HEIGHT - 50) // ITEM_HEIGHT
 
+        # Event handlers by type; everything else (e.g. MOUSEMOTION) is blocked at the source
+        self.running = False
+        self._dispatch = {
+            pygame.QUIT: self._on_quit,
+            pygame.MOUSEWHEEL: self.handle_mouse_scroll,
+            pygame.KEYDOWN: self._on_key,
+            pygame.MOUSEBUTTONDOWN: self._on_click,
+            pygame.VIDEOEXPOSE: self._on_expose,
+        }
+        self._event_types = list(self._dispatch)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self._event_types)
+
+        # Redraw only when visible state has changed
+        self._dirty = True
+
+        # Sidebar text that never changes is rendered once
+        self._static_surfs = self.render_static_sidebar()
+
+        # Background directory scans: path -> (FileItem, Future)
+        self._executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS)
+        self._pending_scans = {}
+
+        # Prefetch has its own workers so it never delays a scan the user asked for
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+        self._prefetch_slots = threading.BoundedSemaphore(PREFETCH_LIMIT)
+        self._prefetching = set()  # Paths queued or being scanned
+
         # Load initial directory
         self.load_directory(self.root_item)
 
+    @staticmethod
+    def _scan_dir(path):
+        """Return sorted (name, path, is_dir) tuples for folders and .wav files in path"""
+        items = []
+        # Get all items in directory (scandir reuses dirent type info; only symlinks need a stat)
+        with os.scandir(path) as it:
+            for entry in it:
+                is_dir = entry.is_dir()
+                if is_dir or (entry.is_file() and entry.name.endswith(WAV_SUFFIXES)):
+                    items.append((entry.name, entry.path, is_dir))
+
+        # Sort: directories first, then files
+        items.sort(key=lambda x: (not x[2], x[0].lower()))  # dirs first, then alphabetical
+        return items
+
+    def attach_children(self, parent_item, items):
+        """Create child FileItems from scanned (name, path, is_dir) tuples"""
+        parent_item.children = []
+        for name, path, is_dir in items:
+            child_item = FileItem(name, path, is_dir, parent_item.depth + 1, parent_item)
+            parent_item.children.append(child_item)
+
+        parent_item.loaded = True
+        parent_item._prefetched_children = None
+        self._flat_dirty = True
+        self._dirty = True
+
+        # Subfolders are likely to be expanded next
+        self.prefetch_children(parent_item)
+
     def load_directory(self, parent_item):
         """Load directory contents into a FileItem"""
         try:
-            items = []
-            # Get all items in directory
-            for item_name in os.listdir(parent_item.path):
-                item_path = os.path.join(parent_item.path, item_name)
-                if os.path.isdir(item_path) or (os.path.isfile(item_path) and item_name.lower().endswith('.wav')):
-                    items.append((item_name, item_path, os.path.isdir(item_path)))
-
-            # Sort: directories first, then files
-            items.sort(key=lambda x: (not x[2], x[0].lower()))  # dirs first, then alphabetical
-
-            parent_item.children = []
-            for name, path, is_dir in items:
-                child_item = FileItem(name, path, is_dir, parent_item.depth + 1, parent_item)
-                parent_item.children.append(child_item)
-
-            parent_item.loaded = True
-        except PermissionError:
+            self.attach_children(parent_item, self._scan_dir(parent_item.path))
+        except OSError:
+            # Unreadable, removed or renamed since it was listed
             pass
 
-    def get_flat_items(self, item=None, visible=True):
-        """Get flattened list of visible items for display"""
-        if item is None:
-            item = self.root_item
-            self.flat_items = []
-
-        if visible:
-            self.flat_items.append(item)
-
-        if item.is_dir and item.expanded:
-            for child in item.children:
-                self.get_flat_items(child, True)
+    def load_directory_async(self, parent_item):
+        """Scan a directory on the worker pool; poll_directory_scans attaches the result"""
+        if parent_item.path in self._pending_scans:
+            return
+        future = self._executor.submit(self._scan_dir, parent_item.path)
+        self._pending_scans[parent_item.path] = (parent_item, future)
+
+    def prefetch_children(self, parent_item):
+        """Queue the first subfolders of a freshly loaded folder for scanning"""
+        self.prefetch(parent_item.children[:PREFETCH_NEIGHBOURS])
+
+    def prefetch_neighbours(self, item):
+        """Queue the folders next to an expanded folder, since siblings tend to be expanded next"""
+        if item.parent is None:
+            return
+        siblings = item.parent.children
+        idx = siblings.index(item)
+        after = siblings[idx + 1:idx + 1 + PREFETCH_NEIGHBOURS]
+        before = siblings[max(0, idx - PREFETCH_NEIGHBOURS):idx]
+        self.prefetch(after + before[::-1])
+
+    def prefetch(self, items):
+        """Queue unloaded folders for scanning ahead of an expand"""
+        for item in items:
+            if (not item.is_dir or item.loaded or item._prefetched_children is not None
+                    or item.path in self._prefetching):
+                continue
+            # A slot is held until the scan finishes, so at most PREFETCH_LIMIT are outstanding
+            if not self._prefetch_slots.acquire(blocking=False):
+                break
+            self._prefetching.add(item.path)
+            self._prefetch_executor.submit(self._prefetch_dir, item)
 
-        return self.flat_items
+    def _prefetch_dir(self, item):
+        """Worker task: scan one folder and stash the listing on its FileItem"""
+        try:
+            if item.loaded or item._prefetched_children is not None:
+                return
+            item._prefetched_children = self._scan_dir(item.path)
+        except OSError:
+            pass
+        finally:
+            self._prefetching.discard(item.path)
+            self._prefetch_slots.release()
+
+    def poll_directory_scans(self):
+        """Attach the children of any finished background scans"""
+        for path, (parent_item, future) in list(self._pending_scans.items()):
+            if not future.done():
+                continue
+            del self._pending_scans[path]
+            if parent_item.loaded:
+                continue
+            try:
+                self.attach_children(parent_item, future.result())
+            except OSError:
+                # Unreadable, removed or renamed since it was listed
+                pass
+
+    def toggle_folder(self, item):
+        """Expand/collapse a folder, loading its contents in the background on first expand"""
+        if not item.loaded:
+            if item._prefetched_children is not None:
+                self.attach_children(item, item._prefetched_children)
+            else:
+                self.load_directory_async(item)
+        item.expanded = not item.expanded
+        self._flat_dirty = True
+        if item.expanded:
+            self.prefetch_neighbours(item)
+
+    def get_flat_items(self):
+        """Get flattened list of visible items for display (cached until the tree changes)"""
+        if self._flat_dirty:
+            self._rebuild_flat()
+            self._flat_dirty = False
+        return self._flat_cache
+
+    def _rebuild_flat(self):
+        """Rebuild the flat cache with an explicit stack walk (depth-first, display order)"""
+        stack = [self.root_item]
+        out = []
+        n_dirs = 0
+        while stack:
+            item = stack.pop()
+            out.append(item)
+            if item.is_dir:
+                n_dirs += 1
+                if item.expanded:
+                    stack.extend(reversed(item.children))
+        self._flat_cache = out
+        self._flat_index = {id(item): i for i, item in enumerate(out)}
+        self.n_dirs = n_dirs
+        self.n_wavs = len(out) - n_dirs
 
     def find_item_by_path(self, path, items=None):
         """Find a FileItem by its path"""
@@ -128,27 +270,49 @@ class AudioBrowser:
             print(f"Error playing {filename}: {e}")
             return False
 
+    def render_static_sidebar(self):
+        """Pre-render the sidebar title and controls as (surface, position) pairs"""
+        # Title and subtitle
+        static_surfs = [
+            (self.title_font.render("Sample Browser", True, TEXT_WHITE), (20, 20)),
+            (self.small_font.render("SuperCollider Samples", True, TEXT_GRAY), (20, 55)),
+        ]
+
+        # Controls section
+        static_surfs.append((self.small_font.render("Controls:", True, TEXT_GRAY), (20, 250)))
+
+        controls = [
+            "Click file - Play sample",
+            "Click folder - Expand/collapse",
+            "↑↓ - Navigate list",
+            "Enter - Expand/collapse folder",
+            "Space - Play selected",
+            "P - Stop playback",
+            "Mouse wheel - Scroll",
+            "Esc - Collapse all"
+        ]
+
+        for i, control in enumerate(controls):
+            control_surf = self.small_font.render(control, True, TEXT_LIGHT)
+            static_surfs.append((control_surf, (20, 275 + i * 20)))
+
+        # Match the screen's pixel format so blits don't convert every frame
+        return [(surf.convert_alpha(), pos) for surf, pos in static_surfs]
+
     def draw_sidebar(self):
         """Draw the sidebar with navigation and info"""
         # Sidebar background
         pygame.draw.rect(self.screen, LIGHT_BG, (0, 0, SIDEBAR_WIDTH, SCREEN_HEIGHT))
 
-        # Title
-        title = self.title_font.render("Sample Browser", True, TEXT_WHITE)
-        self.screen.blit(title, (20, 20))
-
-        # Subtitle
-        subtitle = self.small_font.render("SuperCollider Samples", True, TEXT_GRAY)
-        self.screen.blit(subtitle, (20, 55))
+        # Title, subtitle and controls (pre-rendered)
+        self.screen.blits(self._static_surfs)
 
-        # Stats
+        # Stats (counts are maintained by _rebuild_flat)
         flat_items = self.get_flat_items()
-        dirs = [f for f in flat_items if f.is_dir]
-        wavs = [f for f in flat_items if not f.is_dir]
 
         stats_text = [
-            f"Folders: {len(dirs)}",
-            f"Samples: {len(wavs)}",
+            f"Folders: {self.n_dirs}",
+            f"Samples: {self.n_wavs}",
             f"Visible: {len(flat_items)} items"
         ]
 
@@ -164,25 +328,6 @@ class AudioBrowser:
             playing_text = self.font.render(self.currently_playing, True, SUCCESS)
             self.screen.blit(playing_text, (20, 200))
 
-        # Controls section
-        controls_title = self.small_font.render("Controls:", True, TEXT_GRAY)
-        self.screen.blit(controls_title, (20, 250))
-
-        controls = [
-            "Click file - Play sample",
-            "Click folder - Expand/collapse",
-            "↑↓ - Navigate list",
-            "Enter - Expand/collapse folder",
-            "Space - Play selected",
-            "P - Stop playback",
-            "Mouse wheel - Scroll",
-            "Esc - Collapse all"
-        ]
-
-        for i, control in enumerate(controls):
-            control_surf = self.small_font.render(control, True, TEXT_LIGHT)
-            self.screen.blit(control_surf, (20, 275 + i * 20))
-
     def draw_scrollbar(self, total_items):
         """Draw the scrollbar"""
         scrollbar_width = 12
@@ -231,41 +376,55 @@ class AudioBrowser:
         start_idx = self.scroll_offset
         end_idx = min(start_idx + self.max_visible_items, total_items)
 
-        # Draw visible items
-        y_pos = 50
-        for i in range(start_idx, end_idx):
-            if i >= len(flat_items):
-                break
-
-            item = flat_items[i]
-            item_rect = pygame.Rect(SIDEBAR_WIDTH + 10 + (item.depth * INDENT_SIZE),
-                                  y_pos,
-                                  SCREEN_WIDTH - SIDEBAR_WIDTH - 30 - (item.depth * INDENT_SIZE),
-                                  ITEM_HEIGHT)
+        # Collect visible items: row backgrounds and text blits are drawn in batches below
+        rects_accent = []
+        rects_playing = []
+        blit_list = []
 
+        y_pos = 50
+        for item in flat_items[start_idx:end_idx]:
             # Background
             if item == self.selected_item:
-                pygame.draw.rect(self.screen, ACCENT, item_rect, border_radius=4)
+                rects_accent.append(self.row_rect(item, y_pos))
                 color = TEXT_WHITE
             elif item.name == self.currently_playing:
-                pygame.draw.rect(self.screen, (76, 175, 80, 50), item_rect, border_radius=4)
+                rects_playing.append(self.row_rect(item, y_pos))
                 color = SUCCESS
             else:
                 color = TEXT_LIGHT
 
-            # Icon and text
-            if item.is_dir:
-                icon = "▶" if not item.expanded else "▼"
-            else:
-                icon = "●"
+            # Icon and text (re-rendered only when the expanded state or color changes)
+            cache_key = (item.expanded, color)
+            if item._cached_key != cache_key:
+                if item.is_dir:
+                    icon = "▶" if not item.expanded else "▼"
+                else:
+                    icon = "●"
 
-            display_text = f"{icon} {item.name}"
+                display_text = f"{icon} {item.name}"
 
-            file_text = self.font.render(display_text, True, color)
-            self.screen.blit(file_text, (SIDEBAR_WIDTH + 25 + (item.depth * INDENT_SIZE), y_pos + 7))
+                # convert_alpha once so later blits skip the per-blit pixel format conversion
+                item._cached_surf = self.font.render(display_text, True, color).convert_alpha()
+                item._cached_key = cache_key
+
+            blit_list.append((item._cached_surf, (SIDEBAR_WIDTH + 25 + (item.depth * INDENT_SIZE), y_pos + 7)))
 
             y_pos += ITEM_HEIGHT
 
+        # Draw visible items
+        for item_rect in rects_accent:
+            pygame.draw.rect(self.screen, ACCENT, item_rect, border_radius=4)
+        for item_rect in rects_playing:
+            pygame.draw.rect(self.screen, (76, 175, 80, 50), item_rect, border_radius=4)
+        self.screen.blits(blit_list, doreturn=False)
+
+    def row_rect(self, item, y_pos):
+        """Background rect for a file list row"""
+        return pygame.Rect(SIDEBAR_WIDTH + 10 + (item.depth * INDENT_SIZE),
+                           y_pos,
+                           SCREEN_WIDTH - SIDEBAR_WIDTH - 30 - (item.depth * INDENT_SIZE),
+                           ITEM_HEIGHT)
+
     def draw(self):
         """Draw the entire interface"""
         self.screen.fill(DARK_BG)
@@ -293,93 +452,107 @@ class AudioBrowser:
             self.scroll_offset = min(len(flat_items) - self.max_visible_items,
                                    item_index - self.max_visible_items + 1)
 
+    def _on_quit(self, event):
+        """Handle window close"""
+        self.running = False
+
+    def _on_expose(self, event):
+        """Window needs repainting (e.g. after being restored); run marks it dirty"""
+
+    def _on_key(self, event):
+        """Handle keyboard navigation"""
+        flat_items = self.get_flat_items()
+
+        if event.key == pygame.K_ESCAPE:
+            # Collapse all folders
+            def collapse_all(item):
+                item.expanded = False
+                for child in item.children:
+                    if child.is_dir:
+                        collapse_all(child)
+            collapse_all(self.root_item)
+            self._flat_dirty = True
+            self.scroll_offset = 0
+
+        elif event.key == pygame.K_UP and flat_items:
+            # Navigate up
+            if self.selected_item:
+                current_idx = self._flat_index.get(id(self.selected_item), 0)
+                new_idx = max(0, current_idx - 1)
+                self.selected_item = flat_items[new_idx]
+                self.ensure_visible(new_idx)
+            else:
+                self.selected_item = flat_items[0]
+
+        elif event.key == pygame.K_DOWN and flat_items:
+            # Navigate down
+            if self.selected_item:
+                current_idx = self._flat_index.get(id(self.selected_item), 0)
+                new_idx = min(len(flat_items) - 1, current_idx + 1)
+                self.selected_item = flat_items[new_idx]
+                self.ensure_visible(new_idx)
+            else:
+                self.selected_item = flat_items[0]
+
+        elif event.key == pygame.K_RETURN and self.selected_item:
+            # Expand/collapse selected folder
+            if self.selected_item.is_dir:
+                self.toggle_folder(self.selected_item)
+
+        elif event.key == pygame.K_SPACE and self.selected_item:
+            # Play selected file
+            if not self.selected_item.is_dir:
+                self.play_audio(self.selected_item.name, self.selected_item.path)
+
+    def _on_click(self, event):
+        """Handle mouse clicks in the file list"""
+        if event.button == 1:  # Left click
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+
+            # Check if click is in file list area
+            if (mouse_x > SIDEBAR_WIDTH and mouse_x < SCREEN_WIDTH - 20 and
+                mouse_y > 50 and mouse_y < SCREEN_HEIGHT):
+
+                flat_items = self.get_flat_items()
+                item_index = self.scroll_offset + (mouse_y - 50) // ITEM_HEIGHT
+
+                if item_index < len(flat_items):
+                    clicked_item = flat_items[item_index]
+                    self.selected_item = clicked_item
+
+                    if clicked_item.is_dir:
+                        # Expand/collapse folder
+                        self.toggle_folder(clicked_item)
+                    else:
+                        # Play audio file
+                        self.play_audio(clicked_item.name, clicked_item.path)
+
     def run(self):
         """Main game loop"""
-        running = True
+        self.running = True
         clock = pygame.time.Clock()
 
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-                elif event.type == pygame.MOUSEWHEEL:
-                    self.handle_mouse_scroll(event)
-
-                elif event.type == pygame.KEYDOWN:
-                    flat_items = self.get_flat_items()
-
-                    if event.key == pygame.K_ESCAPE:
-                        # Collapse all folders
-                        def collapse_all(item):
-                            item.expanded = False
-                            for child in item.children:
-                                if child.is_dir:
-                                    collapse_all(child)
-                        collapse_all(self.root_item)
-                        self.scroll_offset = 0
-
-                    elif event.key == pygame.K_UP and flat_items:
-                        # Navigate up
-                        if self.selected_item:
-                            current_idx = flat_items.index(self.selected_item)
-                            new_idx = max(0, current_idx - 1)
-                            self.selected_item = flat_items[new_idx]
-                            self.ensure_visible(new_idx)
-                        else:
-                            self.selected_item = flat_items[0]
-
-                    elif event.key == pygame.K_DOWN and flat_items:
-                        # Navigate down
-                        if self.selected_item:
-                            current_idx = flat_items.index(self.selected_item)
-                            new_idx = min(len(flat_items) - 1, current_idx + 1)
-                            self.selected_item = flat_items[new_idx]
-                            self.ensure_visible(new_idx)
-                        else:
-                            self.selected_item = flat_items[0]
-
-                    elif event.key == pygame.K_RETURN and self.selected_item:
-                        # Expand/collapse selected folder
-                        if self.selected_item.is_dir:
-                            if not self.selected_item.loaded:
-                                self.load_directory(self.selected_item)
-                            self.selected_item.expanded = not self.selected_item.expanded
-                            # Reset flat items
-                            self.get_flat_items()
-
-                    elif event.key == pygame.K_SPACE and self.selected_item:
-                        # Play selected file
-                        if not self.selected_item.is_dir:
-                            self.play_audio(self.selected_item.name, self.selected_item.path)
-
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left click
-                        mouse_x, mouse_y = pygame.mouse.get_pos()
-
-                        # Check if click is in file list area
-                        if (mouse_x > SIDEBAR_WIDTH and mouse_x < SCREEN_WIDTH - 20 and
-                            mouse_y > 50 and mouse_y < SCREEN_HEIGHT):
-
-                            flat_items = self.get_flat_items()
-                            item_index = self.scroll_offset + (mouse_y - 50) // ITEM_HEIGHT
-
-                            if item_index < len(flat_items):
-                                clicked_item = flat_items[item_index]
-                                self.selected_item = clicked_item
-
-                                if clicked_item.is_dir:
-                                    # Expand/collapse folder
-                                    if not clicked_item.loaded:
-                                        self.load_directory(clicked_item)
-                                    clicked_item.expanded = not clicked_item.expanded
-                                else:
-                                    # Play audio file
-                                    self.play_audio(clicked_item.name, clicked_item.path)
-
-            self.draw()
-            clock.tick(60)
+        while self.running:
+            self.poll_directory_scans()
+
+            events = pygame.event.get(self._event_types)
+            if not events and not self._dirty:
+                # Idle: sleep until an event arrives, waking periodically for background scans
+                event = pygame.event.wait(16)
+                if event.type in self._dispatch:
+                    events = [event]
+
+            for event in events:
+                self._dispatch[event.type](event)
+                self._dirty = True
+
+            if self._dirty:
+                self.draw()
+                self._dirty = False
+                clock.tick(60)
 
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
         pygame.quit()
 
 if __name__ == "__main__":
@@ -1,10 +1,10 @@
 from pythonosc import dispatcher, osc_server
 from pywizlight import wizlight, PilotBuilder
+import numpy as np
 import asyncio
 import threading
-import queue
 import time
-import statistics
+import math
 import random
 from collections import deque
 
@@ -27,9 +27,13 @@ class OSCLightController:
         self.bulb = None
         self.loop = None
        
-        # Queue system
-        self.event_queue = queue.Queue(maxsize=max_queue_size)
+        # Queue system: bounded deque drops the oldest event on overflow;
+        # _event_ready is an asyncio.Event created inside the loop by start_async_loop
+        self.events = deque(maxlen=max_queue_size)
+        self._event_ready = None
         self.scheduled_events = []  # List of (execute_time, event)
+        self._slot = None  # Latest bulb cycle: {'execute_time', 'event', 'fired'}
+        self._light_task = None  # The one pulse in flight on the bulb
        
         # State
         self.running = True
@@ -48,12 +52,22 @@ class OSCLightController:
         # Statistics
         self.stats = {
             'total': 0,
-            'measured_latencies': deque(maxlen=1000),
             'queue_sizes': deque(maxlen=100),
             'early_count': 0,
-            'late_count': 0
+            'late_count': 0,
+            'fired': 0,
+            'collapsed': 0
         }
        
+        # Running latency mean/variance (Welford), reset on calibration
+        self._lat_n = 0
+        self._lat_mean = 0.0
+        self._lat_M2 = 0.0
+       
+        # Ring buffer of the last 1000 latencies for percentiles
+        self._lats = np.empty(1000, dtype=np.float64)
+        self._lat_write = 0
+       
         # Sound mapping
         self.sound_map = {
             'bd': {'rgb': (255, 0, 0), 'brightness': 100, 'duration': 0.08},
@@ -63,6 +77,12 @@ class OSCLightController:
             'default': {'rgb': (255, 255, 255), 'brightness': 50, 'duration': 0.05}
         }
        
+        # Pilot frames are fixed per sound, so build them once
+        self._pilot_cache = {
+            sound: PilotBuilder(rgb=m['rgb'], brightness=m['brightness'])
+            for sound, m in self.sound_map.items()
+        }
+       
         print(f"🎯 Target latency: {target_latency*1000:.0f}ms")
         print(f"⚙️  Using intentional delay: {self.intentional_delay*1000:.0f}ms")
         print(f"   (System: {self.system_overhead*1000:.0f}ms + "
@@ -79,15 +99,16 @@ class OSCLightController:
 
     def osc_handler(self, address, *args):
         """Handle OSC messages - SIMPLIFIED: just put in queue"""
-        receive_time = time.perf_counter()
+        receive_perf = time.perf_counter()  # High resolution, for latency measurement
+        receive_time = time.monotonic()  # Same clock as loop.time(), for scheduling
        
-        # Parse arguments
-        args_dict = {}
-        for i in range(0, len(args), 2):
-            if i+1 < len(args):
-                args_dict[args[i]] = args[i+1]
+        # Find the sound name in the key/value argument pairs
+        sound = None
+        for i in range(0, len(args) - 1, 2):
+            if args[i] == 's':
+                sound = args[i+1]
+                break
        
-        sound = args_dict.get('s')
         if not sound:
             return
        
@@ -95,21 +116,21 @@ class OSCLightController:
         event = {
             'sound': sound,
             'receive_time': receive_time,
+            'receive_perf': receive_perf,
             'event_id': self.stats['total']
         }
        
         self.stats['total'] += 1
        
-        # Put in queue for processing
-        try:
-            self.event_queue.put(event, block=False)
-        except queue.Full:
-            # Queue full, try to make space
-            try:
-                self.event_queue.get_nowait()  # Remove oldest
-                self.event_queue.put(event, block=False)
-            except:
-                pass
+        # Hand off to the event loop thread for processing
+        if self._event_ready is None:
+            return
+        self.loop.call_soon_threadsafe(self._enqueue, event)
+
+    def _enqueue(self, event):
+        """Append an event and wake the processor (runs on the event loop thread)"""
+        self.events.append(event)
+        self._event_ready.set()
 
     async def process_events_with_delay(self):
         """
@@ -118,67 +139,107 @@ class OSCLightController:
         print(f"⏱️  Processor started (target: {self.target_latency*1000:.0f}ms total)")
        
         while self.running:
-            current_time = time.perf_counter()
-           
             try:
-                # Get next event (block with timeout)
-                event = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: self.event_queue.get(timeout=0.001))
-               
-                # Calculate when this event should execute
-                # We want it to happen at: receive_time + intentional_delay
-                execute_time = event['receive_time'] + self.intentional_delay
-               
-                # Wait until it's time to execute
-                wait_time = execute_time - current_time
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-               
-                # Execute the light
-                actual_execute_time = time.perf_counter()
-                await self.execute_light(event['sound'])
-               
-                # Calculate actual latency
-                actual_latency = actual_execute_time - event['receive_time']
-                self.stats['measured_latencies'].append(actual_latency)
-               
-                # Check if we're early/late
-                latency_error = actual_latency - self.target_latency
-                if latency_error < -0.005:  # More than 5ms early
-                    self.stats['early_count'] += 1
-                elif latency_error > 0.005:  # More than 5ms late
-                    self.stats['late_count'] += 1
-               
-                # Log significant errors
-                if abs(latency_error) > 0.020:
-                    direction = "🔼" if latency_error > 0 else "🔽"
-                    print(f"{direction} Error: {latency_error*1000:+.0f}ms "
-                          f"(actual: {actual_latency*1000:.0f}ms)")
-               
-                # Periodic stats
-                if self.stats['total'] % 50 == 0:
-                    self.print_stats()
+                # Get next event (delivered by _enqueue via call_soon_threadsafe)
+                await self._event_ready.wait()
+                if not self.running:
+                    return
+                while self.events:
+                    self._schedule(self.events.popleft())
+                self._event_ready.clear()
                    
-            except queue.Empty:
-                await asyncio.sleep(0.005)
             except Exception as e:
                 print(f"Processor error: {e}")
                 await asyncio.sleep(0.01)
 
+    def _schedule(self, event):
+        """Schedule an event, collapsing it into the current bulb cycle if it falls inside it"""
+        # Calculate when this event should execute
+        # We want it to happen at: receive_time + intentional_delay
+        execute_time = event['receive_time'] + self.intentional_delay
+       
+        # The bulb can only show one pulse per cycle (the pulse duration), so an
+        # event inside the current cycle is merged into it instead of firing again
+        slot = self._slot
+        if slot and execute_time < slot['execute_time'] + self._duration(slot['event']):
+            if not slot['fired']:
+                # Before it fires, keep the highest-priority (brightest) sound, latest on ties
+                if self._priority(event) >= self._priority(slot['event']):
+                    slot['event'] = event
+                self.stats['collapsed'] += 1
+                return
+            if self._priority(event) <= self._priority(slot['event']):
+                # Never cut short a pulse that is at least as bright
+                self.stats['collapsed'] += 1
+                return
+            # A brighter hit takes over the weaker pulse that is already lit
+       
+        # Let the loop's scheduler wake us exactly then
+        self._slot = {'execute_time': execute_time, 'event': event, 'fired': False}
+        self.loop.call_at(execute_time, self._fire, self._slot)
+
+    def _priority(self, event):
+        """Priority of an event when collapsing hits within one bulb cycle"""
+        mapping = self.sound_map.get(event['sound'], self.sound_map['default'])
+        return mapping['brightness']
+
+    def _duration(self, event):
+        """Pulse duration of an event, which is also its bulb cycle"""
+        mapping = self.sound_map.get(event['sound'], self.sound_map['default'])
+        return mapping.get('duration', self.pulse_duration)
+
+    def _fire(self, slot):
+        """Execute the event chosen for a bulb cycle (called by loop.call_at)"""
+        try:
+            slot['fired'] = True
+            event = slot['event']
+            self.stats['fired'] += 1
+           
+            # Execute the light
+            actual_execute_time = time.perf_counter()
+            # One pulse at a time: _schedule only starts a cycle over a lit pulse when it is
+            # brighter, so cancelling never drops a stronger hit, and the old turn_off
+            # can't land in the middle of this pulse
+            if self._light_task and not self._light_task.done():
+                self._light_task.cancel()
+            self._light_task = asyncio.create_task(self.execute_light(event['sound']))
+           
+            # Calculate actual latency
+            # (perf_counter: monotonic is ~15.6 ms coarse on Windows before Python 3.13)
+            actual_latency = actual_execute_time - event['receive_perf']
+            self._record_latency(actual_latency)
+           
+            # Check if we're early/late
+            latency_error = actual_latency - self.target_latency
+            if latency_error < -0.005:  # More than 5ms early
+                self.stats['early_count'] += 1
+            elif latency_error > 0.005:  # More than 5ms late
+                self.stats['late_count'] += 1
+           
+            # Log significant errors
+            if abs(latency_error) > 0.020:
+                direction = "🔼" if latency_error > 0 else "🔽"
+                print(f"{direction} Error: {latency_error*1000:+.0f}ms "
+                      f"(actual: {actual_latency*1000:.0f}ms)")
+           
+            # Periodic stats
+            if self.stats['fired'] % 50 == 0:
+                self.print_stats()
+               
+        except Exception as e:
+            print(f"Processor error: {e}")
+
     async def execute_light(self, sound_name):
-        """Execute light pulse - optimized version"""
-        if not self.bulb:
-            await self.setup_bulb()
+        """Execute light pulse - optimized version (setup_bulb has already run in start_async_loop)"""
+        assert self.bulb is not None
        
         mapping = self.sound_map.get(sound_name, self.sound_map['default'])
         duration = mapping.get('duration', self.pulse_duration)
+        pilot = self._pilot_cache.get(sound_name, self._pilot_cache['default'])
        
         try:
             # Turn on
-            await self.bulb.turn_on(PilotBuilder(
-                rgb=mapping['rgb'],
-                brightness=mapping['brightness']
-            ))
+            await self.bulb.turn_on(pilot)
            
             # Wait for pulse duration
             await asyncio.sleep(duration)
@@ -189,29 +250,43 @@ class OSCLightController:
         except Exception as e:
             print(f"💡 Light error: {e}")
 
+    def _record_latency(self, latency):
+        """Welford update of the running latency mean and variance"""
+        self._lat_n += 1
+        delta = latency - self._lat_mean
+        self._lat_mean += delta / self._lat_n
+        self._lat_M2 += delta * (latency - self._lat_mean)
+       
+        self._lats[self._lat_write % len(self._lats)] = latency
+        self._lat_write += 1
+
     def print_stats(self):
         """Print current statistics"""
-        if not self.stats['measured_latencies']:
+        if not self._lat_n:
             return
        
-        latencies = list(self.stats['measured_latencies'])
-        avg_ms = statistics.mean(latencies) * 1000
+        avg_ms = self._lat_mean * 1000
        
-        if len(latencies) > 1:
-            std_ms = statistics.stdev(latencies) * 1000
+        if self._lat_n > 1:
+            std_ms = math.sqrt(self._lat_M2 / (self._lat_n - 1)) * 1000
         else:
             std_ms = 0
        
-        total = max(1, self.stats['total'])
-        early_pct = (self.stats['early_count'] / total) * 100
-        late_pct = (self.stats['late_count'] / total) * 100
+        window = self._lats[:min(self._lat_write, len(self._lats))]
+        p50_ms, p95_ms, p99_ms = np.percentile(window, [50, 95, 99]) * 1000
+       
+        fired = max(1, self.stats['fired'])
+        early_pct = (self.stats['early_count'] / fired) * 100
+        late_pct = (self.stats['late_count'] / fired) * 100
        
         print(f"\n📊 Stats: "
-              f"Avg: {avg_ms:.0f}ms (±{std_ms:.0f}ms) | "
+              f"Avg since calibration: {avg_ms:.0f}ms (±{std_ms:.0f}ms) | "
+              f"Last {len(window)} p50/p95/p99: {p50_ms:.0f}/{p95_ms:.0f}/{p99_ms:.0f}ms | "
               f"Target: {self.target_latency*1000:.0f}ms | "
               f"Error: {(avg_ms - self.target_latency*1000):+.0f}ms | "
               f"Early: {early_pct:.0f}% | Late: {late_pct:.0f}% | "
-              f"Queue: {self.event_queue.qsize()}")
+              f"Collapsed: {self.stats['collapsed']} | "
+              f"Queue: {len(self.events)}")
 
     def update_delay(self, adjustment_ms):
         """
@@ -233,12 +308,12 @@ class OSCLightController:
         """
         Auto-calibrate based on measured latency
         """
-        if len(self.stats['measured_latencies']) < 10:
+        if self._lat_n < 10:
             print("⚠️  Need more data to calibrate (min 10 events)")
             return
        
         # Calculate average measured latency
-        avg_measured = statistics.mean(self.stats['measured_latencies'])
+        avg_measured = self._lat_mean
         error = avg_measured - self.target_latency
        
         # Calculate adjustment needed
@@ -254,9 +329,13 @@ class OSCLightController:
         self.update_delay(adjustment_ms)
        
         # Reset stats for fresh measurement
-        self.stats['measured_latencies'].clear()
+        self._lat_n = 0
+        self._lat_mean = 0.0
+        self._lat_M2 = 0.0
+        self._lat_write = 0
         self.stats['early_count'] = 0
         self.stats['late_count'] = 0
+        self.stats['fired'] = 0
 
     def start_async_loop(self):
         """Start the asyncio event loop"""
@@ -264,8 +343,10 @@ class OSCLightController:
         asyncio.set_event_loop(self.loop)
        
         async def main():
+            self._event_ready = asyncio.Event()
             await self.setup_bulb()
             await self.process_events_with_delay()
+            await self._async_shutdown()
        
         def run_loop():
             self.loop.run_until_complete(main())
@@ -355,11 +436,15 @@ class OSCLightController:
         """Clean shutdown"""
         self.running = False
         if self.loop:
-            asyncio.run_coroutine_threadsafe(self._async_shutdown(), self.loop)
+            # Wake the processor so it sees running == False; main() then runs _async_shutdown
+            if self._event_ready is not None:
+                self.loop.call_soon_threadsafe(self._event_ready.set)
         time.sleep(0.5)
 
     async def _async_shutdown(self):
         """Async cleanup"""
+        if self._light_task and not self._light_task.done():
+            self._light_task.cancel()
         if self.bulb:
             try:
                 await self.bulb.turn_off()